@@ -18,13 +18,50 @@ A test case can use these checks by declaring their enclosing mixin classes
 as superclass and providing the expected_* variables required by the check_*()
 methods in the mixin classes.
 """
+import functools
 import os.path
-from glslc_test_framework import GlslCTest
-
-def convert_to_unix_line_endings(source):
-    """Converts all line endings in source to be unix line endings."""
-    return source.replace('\r\n', '\n').replace('\r', '\n')
-
+import re
+import struct
+from glslc_test_framework import GlslCTest, convert_to_unix_line_endings
+
+# SPIR-V module magic number, encoded in little and big endian
+SPIRV_MAGIC_LE = b'\x03\x02\x23\x07'
+SPIRV_MAGIC_BE = b'\x07\x23\x02\x03'
+# SPIR-V version number expected in the module preamble
+EXPECTED_VERSION = 99
+# glslang SPIR-V generator magic number
+EXPECTED_GENERATOR = 0x051a00bb
+# The four SPIR-V preamble words following the magic number
+_LE_HEADER = struct.Struct('<4I')
+_BE_HEADER = struct.Struct('>4I')
+# Leading lines of a SPIR-V assembly file
+SPIRV_ASSEMBLY_PREAMBLE = (b'// Module Version 99\n'
+                           b'// Generated by (magic number): 51a00bb\n')
+
+# Matches a line wider than 80 columns
+_WIDE_LINE = re.compile(r'[^\r\n]{81,}')
+# Shader file extensions that are kept when substituting file extensions
+_SHADER_EXTS = ('.vert', '.frag', '.tesc', '.tese', '.geom', '.comp')
+# Maximal number of results kept by memoize for a function
+_MEMOIZE_MAX_SIZE = 1024
+
+def memoize(function):
+    """Caches the results of function, whose arguments must be hashable.
+
+    The cache is cleared once it holds _MEMOIZE_MAX_SIZE results.
+    """
+    cache = {}
+
+    @functools.wraps(function)
+    def memoized_function(*args):
+        if args not in cache:
+            if len(cache) >= _MEMOIZE_MAX_SIZE:
+                cache.clear()
+            cache[args] = function(*args)
+        return cache[args]
+    return memoized_function
+
+@memoize
 def substitute_file_extension(filename, extension):
     """Substitutes file extension, respecting known shader extensions.
 
@@ -33,11 +70,10 @@ def substitute_file_extension(filename, extension):
     foo.unknown -> foo.[extension]
     foo -> foo.[extension]
     """
-    if filename[-5:] not in ['.vert', '.frag', '.tesc', '.tese',
-                             '.geom', '.comp']:
-        return filename.rsplit('.', 1)[0] + '.' + extension
-    else:
+    if filename.endswith(_SHADER_EXTS):
         return filename + '.' + extension
+    else:
+        return filename.rsplit('.', 1)[0] + '.' + extension
 
 
 def get_object_filename(source_filename):
@@ -50,15 +86,6 @@ def get_assembly_filename(source_filename):
     return substitute_file_extension(source_filename, 's')
 
 
-def verify_file_non_empty(filename):
-    """Checks that a given file exists and is not empty."""
-    if not os.path.isfile(filename):
-        return False, 'Cannot find file: ' + filename
-    if not os.path.getsize(filename):
-        return False, 'Empty file: ' + filename
-    return True, ''
-
-
 class ReturnCodeIsZero(GlslCTest):
     """Mixin class for checking that the return code is zero."""
 
@@ -98,60 +125,37 @@ class CorrectObjectFilePreamble(GlslCTest):
 
     def verify_object_file_preamble(self, filename):
         """Checks that the given SPIR-V binary file has correct preamble."""
-
-        def read_word(binary, index, little_endian):
-            """Reads the index-th word from the given binary file."""
-            word = binary[index * 4:(index + 1) * 4]
-            if little_endian:
-                word = reversed(word)
-            return reduce(lambda w, b: (w << 8) | ord(b), word, 0)
-
-        def check_endianness(binary):
-            """Checks the endianness of the given SPIR-V binary file.
-
-            Returns:
-              True if it's little endian, False if it's big endian.
-              None if magic number is wrong.
-            """
-            first_word = read_word(binary, 0, True)
-            if first_word == 0x07230203:
-                return True
-            first_word = read_word(binary, 0, False)
-            if first_word == 0x07230203:
-                return False
-            return None
-
-        success, message = verify_file_non_empty(filename)
-        if not success:
-            return False, message
-
-        with open(filename, 'rb') as object_file:
-            object_file.seek(0, os.SEEK_END)
-            num_bytes = object_file.tell()
-            if num_bytes % 4 != 0:
-                return False, ('Incorrect SPV binary: size should be a multiple'
-                               ' of words')
-            if num_bytes < 20:
-                return False, 'Incorrect SPV binary: size less than 5 words'
-
-            object_file.seek(0)
-            preamble = bytes(object_file.read(20))
-
-            little_endian = check_endianness(preamble)
-            # SPIR-V module magic number
-            if little_endian is None:
-                return False, 'Incorrect SPV binary: wrong magic number'
-
-            # SPIR-V version number
-            if read_word(preamble, 1, little_endian) != 99:
-                return False, 'Incorrect SPV binary: wrong version number'
-            # glslang SPIR-V magic number
-            if read_word(preamble, 2, little_endian) != 0x051a00bb:
-                return False, ('Incorrect SPV binary: wrong generator magic '
-                               'number')
-            # reserved for instruction schema
-            if read_word(preamble, 4, little_endian) != 0:
-                return False, 'Incorrect SPV binary: the 5th byte should be 0'
+        try:
+            with open(filename, 'rb') as object_file:
+                binary = object_file.read()
+        except IOError:
+            return False, 'Cannot find file: ' + filename
+        if not binary:
+            return False, 'Empty file: ' + filename
+        if len(binary) % 4 != 0:
+            return False, ('Incorrect SPV binary: size should be a multiple'
+                           ' of words')
+        if len(binary) < 20:
+            return False, 'Incorrect SPV binary: size less than 5 words'
+
+        # SPIR-V module magic number, which also tells the endianness
+        if binary.startswith(SPIRV_MAGIC_LE):
+            header = _LE_HEADER
+        elif binary.startswith(SPIRV_MAGIC_BE):
+            header = _BE_HEADER
+        else:
+            return False, 'Incorrect SPV binary: wrong magic number'
+        version, generator, _, schema = header.unpack_from(binary, 4)
+
+        # SPIR-V version number
+        if version != EXPECTED_VERSION:
+            return False, 'Incorrect SPV binary: wrong version number'
+        # glslang SPIR-V magic number
+        if generator != EXPECTED_GENERATOR:
+            return False, 'Incorrect SPV binary: wrong generator magic number'
+        # reserved for instruction schema
+        if schema != 0:
+            return False, 'Incorrect SPV binary: the 5th byte should be 0'
 
         return True, ''
 
@@ -160,16 +164,15 @@ class CorrectAssemblyFilePreamble(GlslCTest):
     """Provides methods for verifying preamble for a SPV assembly file."""
 
     def verify_assembly_file_preamble(self, filename):
-        success, message = verify_file_non_empty(filename)
-        if not success:
-            return False, message
-
-        with open(filename) as assembly_file:
-            first_line = assembly_file.readline()
-            second_line = assembly_file.readline()
-
-        if (first_line != '// Module Version 99\n' or
-            second_line != '// Generated by (magic number): 51a00bb\n'):
+        try:
+            with open(filename, 'rb') as assembly_file:
+                preamble = assembly_file.read(len(SPIRV_ASSEMBLY_PREAMBLE))
+        except IOError:
+            return False, 'Cannot find file: ' + filename
+        if not preamble:
+            return False, 'Empty file: ' + filename
+
+        if preamble != SPIRV_ASSEMBLY_PREAMBLE:
             return False, 'Incorrect SPV assembly'
 
         return True, ''
@@ -181,10 +184,12 @@ class ValidObjectFile(SuccessfulReturn, CorrectObjectFilePreamble):
     stdout/stderr."""
 
     def check_object_file_preamble(self, status):
+        verify = self.verify_object_file_preamble
+        directory = status.directory
+        join = os.path.join
         for input_filename in status.input_filenames:
-            object_filename = get_object_filename(input_filename)
-            success, message = self.verify_object_file_preamble(
-                os.path.join(status.directory, object_filename))
+            success, message = verify(
+                join(directory, get_object_filename(input_filename)))
             if not success:
                 return False, message
         return True, ''
@@ -196,17 +201,22 @@ class ValidFileContents(GlslCTest):
 
   def check_file(self, status):
       target_filename = os.path.join(status.directory, self.target_filename)
-      if not os.path.isfile(target_filename):
+      expected_length = len(self.expected_file_contents)
+      try:
+          with open(target_filename, 'r') as target_file:
+              # One character past the expected contents is enough to tell
+              # that a file is too long. The rest of the file is only read on
+              # mismatch, for the failure message.
+              file_contents = target_file.read(expected_length + 1)
+              if file_contents != self.expected_file_contents:
+                  file_contents += target_file.read()
+      except IOError:
           return False, 'Cannot find file: ' + target_filename
-      with open(target_filename, 'r') as target_file:
-          file_contents = target_file.read()
-          if file_contents == self.expected_file_contents:
-            return True, ''
-          return False, ('Incorrect file output: \n{act}\nExpected:\n{exp}'
-                         ''.format(act=file_contents,
-                                   exp=self.expected_file_contents))
-      return False, ('Could not open target file ' + target_filename +
-                     ' for reading')
+      if file_contents == self.expected_file_contents:
+          return True, ''
+      return False, ('Incorrect file output: \n{act}\nExpected:\n{exp}'
+                     ''.format(act=file_contents,
+                               exp=self.expected_file_contents))
 
 
 class ValidAssemblyFile(SuccessfulReturn, CorrectAssemblyFilePreamble):
@@ -215,10 +225,12 @@ class ValidAssemblyFile(SuccessfulReturn, CorrectAssemblyFilePreamble):
     stdout/stderr."""
 
     def check_assembly_file_preamble(self, status):
+        verify = self.verify_assembly_file_preamble
+        directory = status.directory
+        join = os.path.join
         for input_filename in status.input_filenames:
-            assembly_filename = get_assembly_filename(input_filename)
-            success, message = self.verify_assembly_file_preamble(
-                os.path.join(status.directory, assembly_filename))
+            success, message = verify(
+                join(directory, get_assembly_filename(input_filename)))
             if not success:
                 return False, message
         return True, ''
@@ -237,7 +249,7 @@ class ErrorMessage(GlslCTest):
                            'glslc')
         if not status.stderr:
             return False, 'Expected error message, but no output on stderr'
-        if self.expected_error != convert_to_unix_line_endings(status.stderr):
+        if self.expected_error != status.unix_stderr:
             return False, ('Incorrect stderr output:\n{act}\n'
                            'Expected:\n{exp}'.format(
                                act=status.stderr, exp=self.expected_error))
@@ -257,7 +269,7 @@ class WarningMessage(GlslCTest):
                            ' glslc')
         if not status.stderr:
             return False, 'Expected warning message, but no output on stderr'
-        if self.expected_warning != convert_to_unix_line_endings(status.stderr):
+        if self.expected_warning != status.unix_stderr:
             return False, ('Incorrect stderr output:\n{act}\n'
                            'Expected:\n{exp}'.format(
                                act=status.stderr, exp=self.expected_warning))
@@ -271,10 +283,12 @@ class ValidObjectFileWithWarning(
     """
 
     def check_object_file_preamble(self, status):
+        verify = self.verify_object_file_preamble
+        directory = status.directory
+        join = os.path.join
         for input_filename in status.input_filenames:
-            object_filename = get_object_filename(input_filename)
-            success, message = self.verify_object_file_preamble(
-                os.path.join(status.directory, object_filename))
+            success, message = verify(
+                join(directory, get_object_filename(input_filename)))
             if not success:
                 return False, message
         return True, ''
@@ -287,10 +301,12 @@ class ValidAssemblyFileWithWarning(
     message."""
 
     def check_assembly_file_preamble(self, status):
+        verify = self.verify_assembly_file_preamble
+        directory = status.directory
+        join = os.path.join
         for input_filename in status.input_filenames:
-            assembly_filename = get_assembly_filename(input_filename)
-            success, message = self.verify_assembly_file_preamble(
-                os.path.join(status.directory, assembly_filename))
+            success, message = verify(
+                join(directory, get_assembly_filename(input_filename)))
             if not success:
                 return False, message
         return True, ''
@@ -339,7 +355,7 @@ class StderrMatch(GlslCTest):
             if not status.stderr:
                 return False, 'Expected something on stderr'
         else:
-            if self.expected_stderr != convert_to_unix_line_endings(status.stderr):
+            if self.expected_stderr != status.unix_stderr:
                 return False, ('Incorrect stderr output:\n{ac}\n'
                                'Expected:\n{ex}'.format(
                                    ac=status.stderr, ex=self.expected_stderr))
@@ -354,11 +370,8 @@ class StdoutNoWiderThan80Columns(GlslCTest):
     """
 
     def check_stdout_not_too_wide(self, status):
-        if not status.stdout:
-            return True, ''
-        else:
-            for line in status.stdout.splitlines():
-                if len(line) > 80:
-                    return False, ('Stdout line longer than 80 columns: %s'
-                                   % line)
+        wide_line = _WIDE_LINE.search(status.stdout)
+        if wide_line:
+            return False, ('Stdout line longer than 80 columns: %s'
+                           % wide_line.group())
         return True, ''
@@ -14,7 +14,9 @@
 
 """Tests for the expect module."""
 
-from expect import get_object_filename
+from expect import ErrorMessage, get_object_filename
+from expect import StdoutNoWiderThan80Columns
+from glslc_test_framework import TestStatus
 from nose.tools import assert_equal
 
 def nosetest_get_object_name():
@@ -31,3 +33,40 @@ def nosetest_get_object_name():
     expected_object_names = [f[1] for f in source_and_object_names]
 
     assert_equal(actual_object_names, expected_object_names)
+
+
+def check_stdout_width(stdout):
+    """Runs StdoutNoWiderThan80Columns on the given stdout."""
+    status = TestStatus(0, stdout, '', '.', [])
+    return StdoutNoWiderThan80Columns().check_stdout_not_too_wide(status)
+
+
+def nosetest_stdout_not_too_wide():
+    """Tests check_stdout_not_too_wide() on text stdout."""
+    assert_equal(check_stdout_width(''), (True, ''))
+    assert_equal(check_stdout_width('a' * 80 + '\r\n' + 'b' * 80), (True, ''))
+    assert_equal(
+        check_stdout_width('a\n' + 'b' * 81 + '\nc'),
+        (False, 'Stdout line longer than 80 columns: ' + 'b' * 81))
+
+
+def nosetest_stdout_not_too_wide_bytes():
+    """Tests check_stdout_not_too_wide() on bytes stdout, as under Python 3."""
+    assert_equal(check_stdout_width(b''), (True, ''))
+    assert_equal(
+        check_stdout_width(b'a' * 80 + b'\r\n' + b'b' * 80), (True, ''))
+    assert_equal(
+        check_stdout_width(b'a\n' + b'b' * 81 + b'\nc'),
+        (False, 'Stdout line longer than 80 columns: ' + 'b' * 81))
+
+
+class ExpectedError(ErrorMessage):
+    expected_error = 'error: 1\nerror: 2\n'
+
+
+def nosetest_has_error_message():
+    """Tests check_has_error_message() on text and bytes stderr."""
+    for stderr in ['error: 1\r\nerror: 2\r\n', b'error: 1\r\nerror: 2\r\n']:
+        status = TestStatus(1, '', stderr, '.', [])
+        assert_equal(
+            ExpectedError().check_has_error_message(status), (True, ''))
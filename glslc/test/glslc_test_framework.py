@@ -45,10 +45,13 @@ If --leave-output was not specified, all temporary files and directories will
 be deleted.
 """
 
+from __future__ import print_function
+
 import argparse
 import fnmatch
 import inspect
 import os
+import re
 import shutil
 import subprocess
 import sys
@@ -60,6 +63,25 @@ from placeholder import PlaceHolder
 EXPECTED_BEHAVIOR_PREFIX = 'expected_'
 VALIDATE_METHOD_PREFIX = 'check_'
 
+# Matches a Windows or old Mac line ending
+_CRLF_RE = re.compile(r'\r\n?')
+
+
+def convert_to_unix_line_endings(source):
+    """Converts all line endings in source to be unix line endings."""
+    return _CRLF_RE.sub('\n', source)
+
+
+def decode_output(output):
+    """Returns process output as str, decoding it from bytes under Python 3.
+
+    Output that is not UTF-8, such as a SPIR-V binary, is decoded with
+    replacement characters.
+    """
+    if isinstance(output, str):
+        return output
+    return output.decode('utf-8', 'replace')
+
 
 def get_all_variables(instance):
     """Returns the names of all the variables in instance."""
@@ -141,12 +163,20 @@ class TestStatus:
 
     def __init__(self, returncode, stdout, stderr, directory, input_filenames):
         self.returncode = returncode
-        self.stdout = stdout
-        self.stderr = stderr
+        self.stdout = decode_output(stdout)
+        self.stderr = decode_output(stderr)
         # temporary directory where the test runs
         self.directory = directory
         # the names of input shader files (without path)
         self.input_filenames = input_filenames
+        self._unix_stderr = None
+
+    @property
+    def unix_stderr(self):
+        """stderr with unix line endings, converted on first use only."""
+        if self._unix_stderr is None:
+            self._unix_stderr = convert_to_unix_line_endings(self.stderr)
+        return self._unix_stderr
 
 
 class GlslCTestException(Exception):
@@ -213,8 +243,8 @@ class TestManager:
         print ('%-10s %-40s ' % (counter_string, test_case.test.name()) +
                ('Passed' if success else '-Failed-'))
         if not success:
-            print ' '.join(test_case.command)
-            print message
+            print(' '.join(test_case.command))
+            print(message)
 
     def add_test(self, testsuite, test):
         """Add this to the current list of test cases."""
@@ -286,7 +316,11 @@ class TestCase:
                 args=self.command, stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE, stderr=subprocess.PIPE,
                 cwd=self.directory)
-            output = process.communicate(self.stdin_shader)
+            stdin_shader = self.stdin_shader
+            if stdin_shader is not None and not isinstance(stdin_shader, bytes):
+                # Under Python 3, pipes take bytes rather than str.
+                stdin_shader = stdin_shader.encode('utf-8')
+            output = process.communicate(stdin_shader)
             test_status = TestStatus(
                 process.returncode, output[0], output[1],
                 self.directory, self.file_shaders)
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from glslc_test_framework import get_all_test_methods, get_all_superclasses
+from glslc_test_framework import TestStatus
 from nose.tools import assert_equal, with_setup
 
 
@@ -102,3 +103,12 @@ def nosetest_get_all_methods():
 
     assert_equal(
         get_all_test_methods(Multi), ['check_r1', 'check_r2', 'check_multi'])
+
+
+def nosetest_unix_stderr():
+    """Tests TestStatus.unix_stderr on text and bytes stderr."""
+    assert_equal(TestStatus(0, '', 'a\r\nb\rc\n', '.', []).unix_stderr,
+                 'a\nb\nc\n')
+    # Python 3's communicate() returns bytes.
+    assert_equal(TestStatus(0, b'', b'a\r\nb\rc\n', '.', []).unix_stderr,
+                 'a\nb\nc\n')